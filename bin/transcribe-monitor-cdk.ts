@@ -10,6 +10,14 @@ new TranscribeMonitorCdkStack(app, 'TranscribeMonitorCdkStack', {
     region: process.env.CDK_DEFAULT_REGION,
   },
 
+  /* Set with -c cloudTrail=existing or -c cloudTrail=create to receive job
+   * start events through CloudTrail */
+  cloudTrail: app.node.tryGetContext('cloudTrail'),
+
+  /* Set with -c dataAccessRoleArn=... to deploy the job request queue used
+   * by the test script's --queue-url option */
+  dataAccessRoleArn: app.node.tryGetContext('dataAccessRoleArn'),
+
   /* Stack description */
   description:
     'Monitors Amazon Transcribe job concurrency and creates CloudWatch metrics and alarms',
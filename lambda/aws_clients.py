@@ -0,0 +1,28 @@
+"""Helpers for creating the AWS clients shared by the Lambda functions"""
+
+import boto3
+from botocore.config import Config
+
+# Reuse connections across API calls, and retry throttling and transient
+# errors in the SDK since the functions have no backoff logic of their own
+CLIENT_CONFIG = Config(
+    tcp_keepalive=True,
+    retries={"mode": "standard"},
+)
+
+
+def create_client(service_name, **config):
+    """
+    Create a boto3 client with the shared configuration
+
+    Callers create their clients at module scope, once per container, so
+    warm invocations reuse them and their open connections.
+
+    Parameters:
+    - service_name: Name of the AWS service, e.g. "dynamodb"
+    - config: botocore Config options overriding the shared configuration
+
+    Returns:
+    - boto3 client
+    """
+    return boto3.client(service_name, config=CLIENT_CONFIG.merge(Config(**config)))
@@ -0,0 +1,38 @@
+"""Helpers for publishing CloudWatch metrics using Embedded Metric Format"""
+
+import json
+import time
+
+
+def emit_metrics(namespace, metrics):
+    """
+    Write metrics to stdout as a CloudWatch Embedded Metric Format document
+
+    CloudWatch Logs extracts the metrics from the log line, so no
+    PutMetricData call is needed. The line is printed rather than logged
+    because the Lambda log handler prefixes records, and EMF requires the
+    whole log event to be the JSON document.
+
+    Parameters:
+    - namespace: CloudWatch namespace for the metrics
+    - metrics: Dictionary of metric name to count
+    """
+    document = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": namespace,
+                    "Dimensions": [["Service"]],
+                    "Metrics": [
+                        {"Name": metric_name, "Unit": "Count"}
+                        for metric_name in metrics
+                    ],
+                }
+            ],
+        },
+        "Service": "Transcribe",
+    }
+    document.update(metrics)
+
+    print(json.dumps(document), flush=True)
@@ -0,0 +1,186 @@
+"""Helpers for maintaining the active job counters in DynamoDB
+
+Each job has an item keyed "<counter>#<job name>". While the job is active
+(QUEUED or IN_PROGRESS) the item carries an ActiveCounter attribute, which
+also places it in the sparse ActiveJobs index. When the job finishes the
+attribute is removed and the item expires via TTL. A finish seen before the
+start leaves a finished item behind, so a late start event is ignored.
+
+Every change to a job item is made in the same transaction as the change to
+its counter item, and guarded by a condition on the job item. Duplicate,
+late or out-of-order events and overlapping reconciliation runs therefore
+change each counter at most once per job start and once per job finish.
+"""
+
+import random
+import time
+
+# Finished job items are kept long enough to absorb late start events
+FINISHED_JOB_TTL_SECONDS = 24 * 60 * 60
+
+# Transactions cancelled by a concurrent transaction on the same items are
+# retried this many times, after a short random delay
+TRANSACTION_CONFLICT_RETRIES = 4
+TRANSACTION_CONFLICT_MAX_DELAY = 0.1
+
+
+def _job_id(counter_name, job_name):
+    return f"{counter_name}#{job_name}"
+
+
+def _transact(dynamodb_client, transact_items):
+    """
+    Run a write transaction
+
+    Every counter update touches the same counter item, so concurrent
+    events for one counter regularly cancel each other with
+    TransactionConflict. Those are retried with jitter; the conditions make
+    a retried transaction safe to apply.
+
+    Returns:
+    - True if it was applied, False if a condition check failed
+    """
+    for attempt in range(TRANSACTION_CONFLICT_RETRIES + 1):
+        try:
+            dynamodb_client.transact_write_items(TransactItems=transact_items)
+            return True
+        except dynamodb_client.exceptions.TransactionCanceledException as e:
+            codes = {
+                reason.get("Code")
+                for reason in e.response.get("CancellationReasons", ())
+            }
+            if "ConditionalCheckFailed" in codes:
+                return False
+            if "TransactionConflict" not in codes or (
+                attempt == TRANSACTION_CONFLICT_RETRIES
+            ):
+                raise
+        time.sleep(random.uniform(0, TRANSACTION_CONFLICT_MAX_DELAY))
+
+
+def _counter_update(table_name, counter_name, delta):
+    return {
+        "Update": {
+            "TableName": table_name,
+            "Key": {"Id": {"S": counter_name}},
+            "UpdateExpression": "ADD JobCount :delta",
+            "ExpressionAttributeValues": {":delta": {"N": str(delta)}},
+        }
+    }
+
+
+def record_job_started(dynamodb_client, table_name, counter_name, job_name):
+    """
+    Count a job as active unless it has already been recorded
+
+    Parameters:
+    - dynamodb_client: boto3 DynamoDB client
+    - table_name: Name of the counter table
+    - counter_name: Name of the counter (and metric) the job belongs to
+    - job_name: Name of the Transcribe job
+
+    Returns:
+    - Boolean indicating whether the counter was incremented
+    """
+    return _transact(
+        dynamodb_client,
+        [
+            {
+                "Put": {
+                    "TableName": table_name,
+                    "Item": {
+                        "Id": {"S": _job_id(counter_name, job_name)},
+                        "JobName": {"S": job_name},
+                        "ActiveCounter": {"S": counter_name},
+                        "RecordedAt": {"N": str(int(time.time()))},
+                    },
+                    "ConditionExpression": "attribute_not_exists(Id)",
+                }
+            },
+            _counter_update(table_name, counter_name, 1),
+        ],
+    )
+
+
+def record_job_finished(dynamodb_client, table_name, counter_name, job_name):
+    """
+    Count a job as no longer active if it is currently counted
+
+    Parameters:
+    - dynamodb_client: boto3 DynamoDB client
+    - table_name: Name of the counter table
+    - counter_name: Name of the counter (and metric) the job belongs to
+    - job_name: Name of the Transcribe job
+
+    Returns:
+    - Boolean indicating whether the counter was decremented
+    """
+    job_id = _job_id(counter_name, job_name)
+    expires_at = {"N": str(int(time.time()) + FINISHED_JOB_TTL_SECONDS)}
+
+    # A start recorded between the two steps makes the tombstone write fail,
+    # in which case the finish is attempted once more
+    for _ in range(2):
+        if _transact(
+            dynamodb_client,
+            [
+                {
+                    "Update": {
+                        "TableName": table_name,
+                        "Key": {"Id": {"S": job_id}},
+                        "UpdateExpression": "REMOVE ActiveCounter SET ExpiresAt = :expires",
+                        "ConditionExpression": "attribute_exists(ActiveCounter)",
+                        "ExpressionAttributeValues": {":expires": expires_at},
+                    }
+                },
+                _counter_update(table_name, counter_name, -1),
+            ],
+        ):
+            return True
+
+        # Either already finished, or the start has not been recorded yet
+        try:
+            dynamodb_client.put_item(
+                TableName=table_name,
+                Item={
+                    "Id": {"S": job_id},
+                    "JobName": {"S": job_name},
+                    "ExpiresAt": expires_at,
+                },
+                ConditionExpression="attribute_not_exists(Id)",
+            )
+            return False
+        except dynamodb_client.exceptions.ConditionalCheckFailedException:
+            continue
+
+    return False
+
+
+def get_job_count(dynamodb_client, table_name, counter_name):
+    """Read the current value of a counter"""
+    response = dynamodb_client.get_item(
+        TableName=table_name,
+        Key={"Id": {"S": counter_name}},
+        ConsistentRead=True,
+    )
+    return int(response.get("Item", {}).get("JobCount", {}).get("N", 0))
+
+
+def list_active_jobs(dynamodb_client, table_name, counter_name):
+    """
+    List the jobs currently counted as active
+
+    Returns:
+    - Dictionary of job name to the epoch second it was recorded
+    """
+    active_jobs = {}
+    paginator = dynamodb_client.get_paginator("query")
+    for page in paginator.paginate(
+        TableName=table_name,
+        IndexName="ActiveJobs",
+        KeyConditionExpression="ActiveCounter = :counter",
+        ExpressionAttributeValues={":counter": {"S": counter_name}},
+    ):
+        for item in page["Items"]:
+            active_jobs[item["JobName"]["S"]] = int(item["RecordedAt"]["N"])
+    return active_jobs
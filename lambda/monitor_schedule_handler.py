@@ -0,0 +1,52 @@
+import logging
+import os
+
+from botocore.exceptions import ClientError
+
+from aws_clients import create_client
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+cloudwatch_client = create_client("cloudwatch")
+events_client = create_client("events")
+
+
+def lambda_handler(event, context):
+    """
+    Lambda function that:
+    1. Is triggered when a concurrency alarm changes state
+    2. Checks whether any concurrency alarm is currently in ALARM
+    3. Enables the frequent reconciliation schedule while one is, and
+       disables it otherwise
+    """
+    alarm_names = os.environ["ALARM_NAMES"].split(",")
+    rule_name = os.environ["FAST_SCHEDULE_RULE_NAME"]
+
+    try:
+        # Check every alarm rather than trusting the triggering event, so
+        # one alarm returning to OK does not hide another still in ALARM
+        response = cloudwatch_client.describe_alarms(
+            AlarmNames=alarm_names, AlarmTypes=["MetricAlarm"]
+        )
+        in_alarm = any(
+            alarm["StateValue"] == "ALARM" for alarm in response["MetricAlarms"]
+        )
+
+        if in_alarm:
+            events_client.enable_rule(Name=rule_name)
+        else:
+            events_client.disable_rule(Name=rule_name)
+
+    except ClientError as e:
+        logger.error("Error updating reconciliation schedule: %s", str(e))
+        raise e
+
+    logger.info(
+        "Frequent reconciliation schedule %s", "enabled" if in_alarm else "disabled"
+    )
+
+    return {
+        "statusCode": 200,
+        "body": f"Frequent reconciliation enabled: {in_alarm}",
+    }
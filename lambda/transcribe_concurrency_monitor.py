@@ -1,110 +1,228 @@
+import logging
 import os
-from datetime import datetime, timezone
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import boto3
 from botocore.exceptions import ClientError
 
+from aws_clients import create_client
+from emf import emit_metrics
+from job_counter import (
+    get_job_count,
+    list_active_jobs,
+    record_job_finished,
+    record_job_started,
+)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Sized for the job types being scanned in parallel
+transcribe_client = create_client("transcribe", max_pool_connections=16)
+dynamodb_client = create_client("dynamodb", max_pool_connections=16)
+
+# List operation, result key, job name key, published metric name for
+# IN_PROGRESS jobs and counter name for active jobs, for each job type
+JOB_TYPES = (
+    (
+        "list_transcription_jobs",
+        "TranscriptionJobSummaries",
+        "TranscriptionJobName",
+        "ConcurrentTranscribeJobs",
+        "ActiveTranscribeJobs",
+    ),
+    (
+        "list_call_analytics_jobs",
+        "CallAnalyticsJobSummaries",
+        "CallAnalyticsJobName",
+        "ConcurrentCallAnalyticsJobs",
+        "ActiveCallAnalyticsJobs",
+    ),
+)
+
+
+def list_job_names(operation, result_key, name_key, status):
+    """
+    List the names of jobs with a given status from a Transcribe list operation
 
-def lambda_handler(event, context):
+    Parameters:
+    - operation: Name of the paginated list operation
+    - result_key: Response key holding the job summaries
+    - name_key: Summary key holding the job name
+    - status: Job status to list
+
+    Returns:
+    - Tuple of (set of job names, whether every page was listed)
     """
-    Lambda function that:
-    1. Calls ListCallAnalyticsJobs API to get all IN_PROGRESS jobs
-    2. Counts the number of concurrent jobs
-    3. Publishes this count as a CloudWatch metric
+    job_names = set()
+    paginator = transcribe_client.get_paginator(operation)
+
+    # Call the API with proper exception handling. Pages are collected as
+    # they arrive so a failure part-way still reports a partial count.
+    try:
+        for page in paginator.paginate(
+            Status=status,
+            PaginationConfig={"PageSize": 100},  # Maximum allowed by the API
+        ):
+            summaries = page.get(result_key)
+            if summaries:
+                job_names.update(summary[name_key] for summary in summaries)
+        return job_names, True
+
+    except ClientError as e:
+        error_code = e.response["Error"]["Code"]
+        error_message = e.response["Error"]["Message"]
+
+        if error_code == "BadRequestException":
+            logger.error(
+                "Bad request error: %s. Check your input parameters.", error_message
+            )
+        elif error_code == "LimitExceededException":
+            logger.warning("Service limit exceeded: %s", error_message)
+            # Still report the jobs we've counted so far
+        elif error_code == "InternalFailureException":
+            logger.warning("Internal AWS service error: %s.", error_message)
+            # Still report the jobs we've counted so far
+        elif error_code == "ConflictException":
+            logger.warning("Conflict error: %s", error_message)
+            # Still report the jobs we've counted so far
+        elif error_code == "ServiceUnavailableException":
+            logger.warning("Service unavailable: %s.", error_message)
+            # Still report the jobs we've counted so far
+        else:
+            # Re-raise unexpected errors
+            raise
+
+        return job_names, False
+
+
+def reconcile_counter(table_name, counter_name, job_names, scan_started):
     """
-    # Initialize AWS clients
-    transcribe_client = boto3.client("transcribe")
-    cloudwatch_client = boto3.client("cloudwatch")
+    Bring the active job counter in line with the jobs Transcribe reports
+
+    Corrections go through the same guarded per-job updates as the event
+    handler, so they cannot double count a job whose event arrives during
+    or after the scan.
 
-    # Get all IN_PROGRESS call analytics jobs
-    concurrent_jobs = 0
-    next_token = None
+    Parameters:
+    - table_name: Name of the counter table
+    - counter_name: Name of the active job counter
+    - job_names: Names of all QUEUED and IN_PROGRESS jobs
+    - scan_started: Epoch second at which the job listing began
+    """
+    active_jobs = list_active_jobs(dynamodb_client, table_name, counter_name)
+
+    # Jobs whose start event is missing or has not arrived yet
+    started = sum(
+        record_job_started(dynamodb_client, table_name, counter_name, job_name)
+        for job_name in job_names - active_jobs.keys()
+    )
+
+    # Jobs whose finish event was missed. Jobs recorded after the listing
+    # began may simply have been started too late to be listed.
+    finished = sum(
+        record_job_finished(dynamodb_client, table_name, counter_name, job_name)
+        for job_name, recorded_at in active_jobs.items()
+        if job_name not in job_names and recorded_at < scan_started
+    )
+
+    if started or finished:
+        logger.warning(
+            "Counter %s had drifted: added %d jobs, removed %d jobs",
+            counter_name,
+            started,
+            finished,
+        )
+
+
+def monitor_job_type(operation, result_key, name_key, counter_name, table_name):
+    """
+    Count one type of job and reconcile its active job counter
 
+    Returns:
+    - Tuple of (IN_PROGRESS job count, active job count or None if unknown)
+    """
+    scan_started = int(time.time())
+
+    # QUEUED is listed first, so a job moving to IN_PROGRESS during the
+    # listing is still seen in one of the two lists
+    queued, queued_complete = list_job_names(
+        operation, result_key, name_key, "QUEUED"
+    )
+    in_progress, in_progress_complete = list_job_names(
+        operation, result_key, name_key, "IN_PROGRESS"
+    )
+
+    # Only reconcile against a full listing
+    if not (table_name and queued_complete and in_progress_complete):
+        return len(in_progress), None
+
+    # A failed reconciliation must not stop the IN_PROGRESS count being
+    # published; the next run corrects the counter instead
     try:
-        while True:
-            # Prepare parameters for ListCallAnalyticsJobs
-            params = {
-                "Status": "IN_PROGRESS",
-                "MaxResults": 100,  # Maximum allowed by the API
+        reconcile_counter(
+            table_name, counter_name, queued | in_progress, scan_started
+        )
+        active_jobs = get_job_count(dynamodb_client, table_name, counter_name)
+    except ClientError as e:
+        logger.error("Error reconciling counter %s: %s", counter_name, str(e))
+        return len(in_progress), None
+
+    return len(in_progress), active_jobs
+
+
+def lambda_handler(event, context):
+    """
+    Lambda function that:
+    1. Calls ListTranscriptionJobs and ListCallAnalyticsJobs APIs to get all
+       QUEUED and IN_PROGRESS jobs
+    2. Counts the number of concurrent (IN_PROGRESS) jobs of each type
+    3. Corrects the event-driven active job counters in DynamoDB
+    4. Publishes the counts as CloudWatch metrics using EMF
+    """
+    try:
+        table_name = os.environ.get("COUNTER_TABLE_NAME")
+
+        # The job types are independent, so scan them in parallel on the
+        # shared clients
+        with ThreadPoolExecutor(max_workers=len(JOB_TYPES)) as executor:
+            futures = {
+                (metric_name, counter_name): executor.submit(
+                    monitor_job_type,
+                    operation,
+                    result_key,
+                    name_key,
+                    counter_name,
+                    table_name,
+                )
+                for (
+                    operation,
+                    result_key,
+                    name_key,
+                    metric_name,
+                    counter_name,
+                ) in JOB_TYPES
             }
 
-            # Add NextToken if we have one from a previous call
-            if next_token:
-                params["NextToken"] = next_token
-
-            # Call the API with proper exception handling
-            try:
-                response = transcribe_client.list_call_analytics_jobs(**params)
-
-                # Count jobs from this response
-                jobs_in_response = len(response.get("CallAnalyticsJobSummaries", []))
-                concurrent_jobs += jobs_in_response
-
-                # Check if there are more results
-                next_token = response.get("NextToken")
-                if not next_token:
-                    break
-
-            except ClientError as e:
-                error_code = e.response["Error"]["Code"]
-                error_message = e.response["Error"]["Message"]
-
-                if error_code == "BadRequestException":
-                    print(
-                        f"Bad request error: {error_message}. Check your input parameters."
-                    )
-                    break
-                elif error_code == "LimitExceededException":
-                    print(f"Service limit exceeded: {error_message}")
-                    # Still report the jobs we've counted so far
-                    break
-                elif error_code == "InternalFailureException":
-                    print(f"Internal AWS service error: {error_message}.")
-                    # Still report the jobs we've counted so far
-                    break
-                elif error_code == "ConflictException":
-                    print(f"Conflict error: {error_message}")
-                    # Still report the jobs we've counted so far
-                    break
-                elif error_code == "ServiceUnavailableException":
-                    print(f"Service unavailable: {error_message}.")
-                    # Still report the jobs we've counted so far
-                    break
-                else:
-                    # Re-raise unexpected errors
-                    raise
+        job_counts = {}
+        for (metric_name, counter_name), future in futures.items():
+            concurrent_jobs, active_jobs = future.result()
+            job_counts[metric_name] = concurrent_jobs
+            if active_jobs is not None:
+                job_counts[counter_name] = active_jobs
 
         # Get namespace from environment variable or use default
         namespace = os.environ.get("CLOUDWATCH_NAMESPACE", "TranscribeMonitoring")
 
-        # Publish metric to CloudWatch with exception handling
-        try:
-            cloudwatch_client.put_metric_data(
-                Namespace=namespace,
-                MetricData=[
-                    {
-                        "MetricName": "ConcurrentCallAnalyticsJobs",
-                        "Value": concurrent_jobs,
-                        "Unit": "Count",
-                        "Timestamp": datetime.now(timezone.utc),
-                        "Dimensions": [{"Name": "Service", "Value": "Transcribe"}],
-                    }
-                ],
-            )
-
-            print(
-                f"Successfully published metric. Current concurrent jobs: {concurrent_jobs}"
-            )
-
-        except ClientError as e:
-            print(f"Error publishing CloudWatch metric: {str(e)}")
-            # We still want to return the job count even if metric publishing fails
+        # Publish all metrics through the log stream using EMF
+        emit_metrics(namespace, job_counts)
+        logger.info("Published metrics. Current jobs: %s", job_counts)
 
         return {
             "statusCode": 200,
-            "body": f"Current concurrent Transcribe call analytics jobs: {concurrent_jobs}",
+            "body": f"Current Transcribe jobs: {job_counts}",
         }
 
     except Exception as e:
-        print(f"Error monitoring Transcribe concurrency: {str(e)}")
+        logger.error("Error monitoring Transcribe concurrency: %s", str(e))
         raise e
@@ -0,0 +1,123 @@
+import logging
+import os
+
+from botocore.exceptions import ClientError
+
+from aws_clients import create_client
+from emf import emit_metrics
+from job_counter import get_job_count, record_job_finished, record_job_started
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+dynamodb_client = create_client("dynamodb")
+
+# Maps the API that started a job to the counter of active (QUEUED or
+# IN_PROGRESS) jobs and the request parameter holding the job name
+START_EVENT_COUNTERS = {
+    "StartTranscriptionJob": ("ActiveTranscribeJobs", "transcriptionJobName"),
+    "StartCallAnalyticsJob": ("ActiveCallAnalyticsJobs", "callAnalyticsJobName"),
+}
+
+# Maps the Transcribe state change event to the counter of active jobs and
+# the detail fields holding the job name and status
+STATE_CHANGE_COUNTERS = {
+    "Transcribe Job State Change": (
+        "ActiveTranscribeJobs",
+        "TranscriptionJobName",
+        "TranscriptionJobStatus",
+    ),
+    "Call Analytics Job State Change": (
+        "ActiveCallAnalyticsJobs",
+        "JobName",
+        "JobStatus",
+    ),
+}
+
+TERMINAL_STATUSES = ("COMPLETED", "FAILED")
+
+
+def parse_job_event(event):
+    """
+    Work out which counter an event affects and how
+
+    Parameters:
+    - event: EventBridge event from the aws.transcribe source
+
+    Returns:
+    - Tuple of (counter name, job name, whether the job started), or
+      (None, None, False) if the event is ignored
+    """
+    detail_type = event.get("detail-type")
+    detail = event.get("detail", {})
+
+    # A successful Start* API call, delivered via CloudTrail
+    if detail_type == "AWS API Call via CloudTrail":
+        counter = START_EVENT_COUNTERS.get(detail.get("eventName"))
+        if counter and not detail.get("errorCode"):
+            counter_name, name_key = counter
+            job_name = (detail.get("requestParameters") or {}).get(name_key)
+            if job_name:
+                return counter_name, job_name, True
+        return None, None, False
+
+    # A job reaching a terminal state
+    counter = STATE_CHANGE_COUNTERS.get(detail_type)
+    if counter:
+        counter_name, name_key, status_key = counter
+        job_name = detail.get(name_key)
+        if job_name and detail.get(status_key) in TERMINAL_STATUSES:
+            return counter_name, job_name, False
+
+    return None, None, False
+
+
+def lambda_handler(event, context):
+    """
+    Lambda function that:
+    1. Receives Transcribe job start and state change events from EventBridge
+    2. Records the job as active or finished, updating the matching counter
+       in DynamoDB at most once per transition
+    3. Emits the current count as a CloudWatch metric using EMF
+    """
+    counter_name, job_name, started = parse_job_event(event)
+    if not counter_name:
+        logger.info("Ignoring event: %s", event.get("detail-type"))
+        return {"statusCode": 200, "body": "Event ignored"}
+
+    table_name = os.environ["COUNTER_TABLE_NAME"]
+    namespace = os.environ.get("CLOUDWATCH_NAMESPACE", "TranscribeMonitoring")
+
+    try:
+        if started:
+            changed = record_job_started(
+                dynamodb_client, table_name, counter_name, job_name
+            )
+        else:
+            changed = record_job_finished(
+                dynamodb_client, table_name, counter_name, job_name
+            )
+
+        active_jobs = get_job_count(dynamodb_client, table_name, counter_name)
+    except ClientError as e:
+        logger.error("Error updating job counter: %s", str(e))
+        raise e
+
+    if not changed:
+        logger.info(
+            "Job %s already recorded as %s",
+            job_name,
+            "started" if started else "finished",
+        )
+
+    # Every change is guarded per job, so a negative count means the table
+    # was modified outside these functions
+    if active_jobs < 0:
+        logger.warning("Counter %s has drifted to %d", counter_name, active_jobs)
+
+    emit_metrics(namespace, {counter_name: active_jobs})
+
+    return {
+        "statusCode": 200,
+        "body": f"{counter_name}: {active_jobs}",
+    }
@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from aws_clients import create_client
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Throttling and transient errors are retried by botocore; anything that
+# still fails is returned to the queue for redelivery. The worst case of
+# 3 attempts x (3s + 10s) plus backoff fits within the 60s function timeout.
+transcribe_client = create_client(
+    "transcribe",
+    max_pool_connections=10,
+    connect_timeout=3,
+    read_timeout=10,
+    retries={"mode": "adaptive", "total_max_attempts": 3},
+)
+
+# Fields every job request message must carry
+REQUEST_FIELDS = ("job_name", "input_bucket", "input_file", "output_bucket")
+
+# The only role this function is allowed to pass to Transcribe
+DATA_ACCESS_ROLE_ARN = os.environ["DATA_ACCESS_ROLE_ARN"]
+
+
+def start_job(message_body):
+    """
+    Start a Call Analytics job described by a queue message
+
+    Parameters:
+    - message_body: JSON string with job_name, input_bucket, input_file,
+      output_bucket and optionally role_arn
+
+    Returns:
+    - Boolean indicating success or failure
+    """
+    # Reject malformed messages before calling Transcribe, so they fail
+    # as bad requests rather than as service errors
+    try:
+        request = json.loads(message_body)
+        fields = {field: request[field] for field in REQUEST_FIELDS}
+        for field, value in fields.items():
+            if not isinstance(value, str) or not value:
+                raise ValueError(f"{field} must be a non-empty string")
+
+        if request.get("role_arn", DATA_ACCESS_ROLE_ARN) != DATA_ACCESS_ROLE_ARN:
+            raise ValueError(f"role_arn must be {DATA_ACCESS_ROLE_ARN}")
+    except (TypeError, ValueError, KeyError) as e:
+        logger.error("Invalid job request message: %s", str(e))
+        return False
+
+    job_name = fields["job_name"]
+
+    try:
+        transcribe_client.start_call_analytics_job(
+            CallAnalyticsJobName=job_name,
+            Media={
+                "MediaFileUri": f"s3://{fields['input_bucket']}/{fields['input_file']}"
+            },
+            DataAccessRoleArn=DATA_ACCESS_ROLE_ARN,
+            OutputLocation=f"s3://{fields['output_bucket']}/transcribe-results/",
+            ChannelDefinitions=[
+                {"ChannelId": 0, "ParticipantRole": "AGENT"},
+                {"ChannelId": 1, "ParticipantRole": "CUSTOMER"},
+            ],
+        )
+        logger.info("Call Analytics Job started: %s", job_name)
+        return True
+
+    except transcribe_client.exceptions.ConflictException:
+        # The message was redelivered after the job had already started
+        logger.info("Call Analytics Job already exists: %s", job_name)
+        return True
+
+    except (BotoCoreError, ClientError) as e:
+        logger.error("Error starting Call Analytics Job %s: %s", job_name, str(e))
+        return False
+
+
+def lambda_handler(event, context):
+    """
+    Lambda function that:
+    1. Receives a batch of job requests from SQS
+    2. Starts a Call Analytics job for each request in parallel
+    3. Reports failed messages so only those are redelivered
+    """
+    records = event.get("Records", [])
+
+    with ThreadPoolExecutor(max_workers=max(len(records), 1)) as executor:
+        results = list(executor.map(lambda r: start_job(r["body"]), records))
+
+    failures = [
+        {"itemIdentifier": record["messageId"]}
+        for record, success in zip(records, results)
+        if not success
+    ]
+    logger.info(
+        "Started %d of %d jobs in batch", len(records) - len(failures), len(records)
+    )
+
+    return {"batchItemFailures": failures}
@@ -5,13 +5,137 @@ import * as iam from 'aws-cdk-lib/aws-iam';
 import * as events from 'aws-cdk-lib/aws-events';
 import * as targets from 'aws-cdk-lib/aws-events-targets';
 import * as cloudwatch from 'aws-cdk-lib/aws-cloudwatch';
+import * as dynamodb from 'aws-cdk-lib/aws-dynamodb';
+import * as sqs from 'aws-cdk-lib/aws-sqs';
+import * as cloudtrail from 'aws-cdk-lib/aws-cloudtrail';
+import * as lambdaEventSources from 'aws-cdk-lib/aws-lambda-event-sources';
 import * as path from 'path';
 
+export interface TranscribeMonitorCdkStackProps extends cdk.StackProps {
+  /**
+   * Source of the CloudTrail events that report job starts: 'existing' if a
+   * trail already records management events in this account and region, or
+   * 'create' to create one. Without a trail, job starts are only picked up
+   * by reconciliation, which then runs every minute.
+   */
+  readonly cloudTrail?: 'existing' | 'create';
+
+  /**
+   * ARN of the IAM role Transcribe uses to access the test script's S3
+   * buckets. The job request queue and submitter Lambda function are only
+   * created when it is set, and the submitter may only pass this role.
+   */
+  readonly dataAccessRoleArn?: string;
+}
+
 export class TranscribeMonitorCdkStack extends cdk.Stack {
-  constructor(scope: Construct, id: string, props?: cdk.StackProps) {
+  constructor(
+    scope: Construct,
+    id: string,
+    props?: TranscribeMonitorCdkStackProps,
+  ) {
     super(scope, id, props);
 
-    // Define the Lambda function
+    const cloudTrail = props?.cloudTrail;
+    if (
+      cloudTrail !== undefined &&
+      !['existing', 'create'].includes(cloudTrail)
+    ) {
+      throw new Error(
+        `cloudTrail must be 'existing' or 'create', got '${cloudTrail}'`,
+      );
+    }
+    const hasTrail = cloudTrail !== undefined;
+
+    if (cloudTrail === 'create') {
+      // Records the management (write) events that carry job starts
+      new cloudtrail.Trail(this, 'ManagementEventsTrail', {
+        isMultiRegionTrail: false,
+        includeGlobalServiceEvents: false,
+        managementEvents: cloudtrail.ReadWriteType.WRITE_ONLY,
+      });
+    }
+
+    // Table holding the event-driven active job counters, plus one item per
+    // job so each start and finish is counted at most once
+    const counterTable = new dynamodb.Table(this, 'JobCounterTable', {
+      partitionKey: { name: 'Id', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      timeToLiveAttribute: 'ExpiresAt',
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+
+    // Sparse index of the jobs currently counted as active, used by the
+    // reconciliation Lambda function
+    counterTable.addGlobalSecondaryIndex({
+      indexName: 'ActiveJobs',
+      partitionKey: {
+        name: 'ActiveCounter',
+        type: dynamodb.AttributeType.STRING,
+      },
+      projectionType: dynamodb.ProjectionType.INCLUDE,
+      nonKeyAttributes: ['JobName', 'RecordedAt'],
+    });
+
+    // Define the Lambda function that maintains the counters from job events
+    const stateHandlerFunction = new lambda.Function(
+      this,
+      'TranscribeJobStateHandler',
+      {
+        runtime: lambda.Runtime.PYTHON_3_13,
+        memorySize: 128,
+        architecture: lambda.Architecture.ARM_64,
+        handler: 'transcribe_job_state_handler.lambda_handler',
+        code: lambda.Code.fromAsset(path.join(__dirname, '../lambda')),
+        timeout: cdk.Duration.seconds(10),
+        environment: {
+          CLOUDWATCH_NAMESPACE: 'TranscribeMonitoring',
+          COUNTER_TABLE_NAME: counterTable.tableName,
+        },
+        description:
+          'Tracks active Amazon Transcribe jobs from job events and publishes metrics using EMF',
+      },
+    );
+
+    counterTable.grantReadWriteData(stateHandlerFunction);
+
+    // Successful job starts, delivered via CloudTrail (requires a trail
+    // recording management events in this account and region)
+    if (hasTrail) {
+      const jobStartRule = new events.Rule(this, 'JobStartRule', {
+        eventPattern: {
+          source: ['aws.transcribe'],
+          detailType: ['AWS API Call via CloudTrail'],
+          detail: {
+            eventSource: ['transcribe.amazonaws.com'],
+            eventName: ['StartTranscriptionJob', 'StartCallAnalyticsJob'],
+          },
+        },
+        description:
+          'Increments the active job counter when a Transcribe job starts',
+      });
+      jobStartRule.addTarget(
+        new targets.LambdaFunction(stateHandlerFunction),
+      );
+    }
+
+    // Jobs reaching COMPLETED or FAILED
+    const jobStateChangeRule = new events.Rule(this, 'JobStateChangeRule', {
+      eventPattern: {
+        source: ['aws.transcribe'],
+        detailType: [
+          'Transcribe Job State Change',
+          'Call Analytics Job State Change',
+        ],
+      },
+      description:
+        'Decrements the active job counter when a Transcribe job finishes',
+    });
+    jobStateChangeRule.addTarget(
+      new targets.LambdaFunction(stateHandlerFunction),
+    );
+
+    // Define the Lambda function that reconciles the counters by polling
     const monitoringFunction = new lambda.Function(
       this,
       'TranscribeConcurrencyMonitor',
@@ -21,9 +145,11 @@ export class TranscribeMonitorCdkStack extends cdk.Stack {
         architecture: lambda.Architecture.ARM_64,
         handler: 'transcribe_concurrency_monitor.lambda_handler',
         code: lambda.Code.fromAsset(path.join(__dirname, '../lambda')),
-        timeout: cdk.Duration.seconds(30),
+        // Allows time to correct many counters, e.g. on the first run
+        timeout: cdk.Duration.minutes(5),
         environment: {
           CLOUDWATCH_NAMESPACE: 'TranscribeMonitoring',
+          COUNTER_TABLE_NAME: counterTable.tableName,
         },
         description:
           'Monitors Amazon Transcribe job concurrency and publishes metrics to CloudWatch',
@@ -33,28 +159,103 @@ export class TranscribeMonitorCdkStack extends cdk.Stack {
     // Add IAM permissions for the Lambda function
     monitoringFunction.addToRolePolicy(
       new iam.PolicyStatement({
-        actions: ['transcribe:ListCallAnalyticsJobs'],
+        actions: [
+          'transcribe:ListTranscriptionJobs',
+          'transcribe:ListCallAnalyticsJobs',
+        ],
         resources: ['*'],
       }),
     );
 
-    monitoringFunction.addToRolePolicy(
-      new iam.PolicyStatement({
-        actions: ['cloudwatch:PutMetricData'],
-        resources: ['*'],
-      }),
-    );
+    counterTable.grantReadWriteData(monitoringFunction);
 
-    // Create an EventBridge Rule to trigger the Lambda every minute
+    // Create an EventBridge Rule to reconcile the counters. With job start
+    // events this only corrects missed events, so every hour is enough;
+    // without them it is the only source of starts and runs every minute
+    // (the shortest rate EventBridge supports).
     const rule = new events.Rule(this, 'ScheduleRule', {
-      schedule: events.Schedule.rate(cdk.Duration.minutes(1)),
-      description:
-        'Triggers the Transcribe concurrency monitoring Lambda function every minute',
+      schedule: events.Schedule.rate(
+        hasTrail ? cdk.Duration.hours(1) : cdk.Duration.minutes(1),
+      ),
+      description: `Triggers the Transcribe concurrency monitoring Lambda function every ${hasTrail ? 'hour' : 'minute'}`,
     });
 
     // Add the Lambda function as a target of the rule
     rule.addTarget(new targets.LambdaFunction(monitoringFunction));
 
+    // The optional job submission path for the test script
+    const dataAccessRoleArn = props?.dataAccessRoleArn;
+    if (dataAccessRoleArn) {
+      // Queue of job requests sent by the test script, with a dead-letter
+      // queue for requests that repeatedly fail to start
+      const jobRequestDlq = new sqs.Queue(this, 'JobRequestDeadLetterQueue', {
+        retentionPeriod: cdk.Duration.days(14),
+      });
+
+      const jobRequestQueue = new sqs.Queue(this, 'JobRequestQueue', {
+        // Six times the submitter timeout, as recommended for Lambda
+        visibilityTimeout: cdk.Duration.minutes(6),
+        deadLetterQueue: {
+          queue: jobRequestDlq,
+          maxReceiveCount: 3,
+        },
+      });
+
+      // Define the Lambda function that starts jobs from queued requests
+      const submitterFunction = new lambda.Function(
+        this,
+        'TranscribeJobSubmitter',
+        {
+          runtime: lambda.Runtime.PYTHON_3_13,
+          memorySize: 128,
+          architecture: lambda.Architecture.ARM_64,
+          handler: 'transcribe_job_submitter.lambda_handler',
+          code: lambda.Code.fromAsset(path.join(__dirname, '../lambda')),
+          // Longer than the SDK's worst case for a message, so slow batches
+          // report item failures instead of timing out
+          timeout: cdk.Duration.seconds(60),
+          environment: {
+            DATA_ACCESS_ROLE_ARN: dataAccessRoleArn,
+          },
+          description:
+            'Starts Amazon Transcribe Call Analytics jobs from queued job requests',
+        },
+      );
+
+      submitterFunction.addEventSource(
+        new lambdaEventSources.SqsEventSource(jobRequestQueue, {
+          batchSize: 10,
+          // Bound the load placed on the Transcribe API
+          maxConcurrency: 10,
+          reportBatchItemFailures: true,
+        }),
+      );
+
+      submitterFunction.addToRolePolicy(
+        new iam.PolicyStatement({
+          actions: ['transcribe:StartCallAnalyticsJob'],
+          resources: ['*'],
+        }),
+      );
+
+      // Allow passing the data access role, and only that role, to Transcribe
+      submitterFunction.addToRolePolicy(
+        new iam.PolicyStatement({
+          actions: ['iam:PassRole'],
+          resources: [dataAccessRoleArn],
+          conditions: {
+            StringEquals: { 'iam:PassedToService': 'transcribe.amazonaws.com' },
+          },
+        }),
+      );
+
+      new cdk.CfnOutput(this, 'JobRequestQueueUrl', {
+        value: jobRequestQueue.queueUrl,
+        description:
+          'URL of the queue used by the test script with --queue-url',
+      });
+    }
+
     // Create a CloudWatch Alarm for when concurrency approaches limit
     // Assuming a limit of 100 concurrent jobs (adjust as needed)
     const metric = new cloudwatch.Metric({
@@ -81,6 +282,131 @@ export class TranscribeMonitorCdkStack extends cdk.Stack {
       treatMissingData: cloudwatch.TreatMissingData.NOT_BREACHING,
     });
 
+    const callAnalyticsMetric = new cloudwatch.Metric({
+      namespace: 'TranscribeMonitoring',
+      metricName: 'ConcurrentCallAnalyticsJobs',
+      dimensionsMap: {
+        Service: 'Transcribe',
+      },
+      statistic: 'Maximum',
+      period: cdk.Duration.minutes(1),
+    });
+
+    const callAnalyticsAlarm = new cloudwatch.Alarm(
+      this,
+      'CallAnalyticsConcurrencyAlarm',
+      {
+        metric: callAnalyticsMetric,
+        threshold: 80, // 80% of assumed 100 job limit - adjust as needed
+        evaluationPeriods: 1,
+        datapointsToAlarm: 1,
+        comparisonOperator:
+          cloudwatch.ComparisonOperator.GREATER_THAN_OR_EQUAL_TO_THRESHOLD,
+        alarmDescription:
+          'Alarm when Transcribe Call Analytics job concurrency exceeds 80% of the limit',
+        treatMissingData: cloudwatch.TreatMissingData.NOT_BREACHING,
+      },
+    );
+
+    // Alarms on the event-driven active (QUEUED or IN_PROGRESS) job counts,
+    // which can be high before the polled concurrency metrics show it. The
+    // counts are only published when they change, so missing data keeps the
+    // current alarm state.
+    const activeJobsAlarms = [
+      ['ActiveTranscribeJobs', 'ActiveTranscribeJobsAlarm', 'transcription'],
+      [
+        'ActiveCallAnalyticsJobs',
+        'ActiveCallAnalyticsJobsAlarm',
+        'Call Analytics',
+      ],
+    ].map(
+      ([metricName, alarmId, jobType]) =>
+        new cloudwatch.Alarm(this, alarmId, {
+          metric: new cloudwatch.Metric({
+            namespace: 'TranscribeMonitoring',
+            metricName,
+            dimensionsMap: {
+              Service: 'Transcribe',
+            },
+            statistic: 'Maximum',
+            period: cdk.Duration.minutes(1),
+          }),
+          threshold: 80, // 80% of assumed 100 job limit - adjust as needed
+          evaluationPeriods: 1,
+          datapointsToAlarm: 1,
+          comparisonOperator:
+            cloudwatch.ComparisonOperator.GREATER_THAN_OR_EQUAL_TO_THRESHOLD,
+          alarmDescription: `Alarm when active Transcribe ${jobType} jobs exceed 80% of the concurrency limit`,
+          treatMissingData: cloudwatch.TreatMissingData.IGNORE,
+        }),
+    );
+
+    // Hourly reconciliation only needs a faster cadence while concurrency
+    // is high
+    if (hasTrail) {
+      // Create a disabled EventBridge Rule to reconcile every minute, enabled
+      // only while a concurrency alarm is firing (one minute is the shortest
+      // rate EventBridge supports)
+      const fastRule = new events.Rule(this, 'FastScheduleRule', {
+        schedule: events.Schedule.rate(cdk.Duration.minutes(1)),
+        enabled: false,
+        description:
+          'Triggers the Transcribe concurrency monitoring Lambda function every minute while concurrency is high',
+      });
+      fastRule.addTarget(new targets.LambdaFunction(monitoringFunction));
+
+      const cadenceAlarms = [alarm, callAnalyticsAlarm, ...activeJobsAlarms];
+
+      // Define the Lambda function that switches the reconciliation cadence
+      // when the concurrency alarms change state
+      const scheduleFunction = new lambda.Function(
+        this,
+        'MonitorScheduleHandler',
+        {
+          runtime: lambda.Runtime.PYTHON_3_13,
+          memorySize: 128,
+          architecture: lambda.Architecture.ARM_64,
+          handler: 'monitor_schedule_handler.lambda_handler',
+          code: lambda.Code.fromAsset(path.join(__dirname, '../lambda')),
+          timeout: cdk.Duration.seconds(10),
+          environment: {
+            ALARM_NAMES: cdk.Fn.join(
+              ',',
+              cadenceAlarms.map((a) => a.alarmName),
+            ),
+            FAST_SCHEDULE_RULE_NAME: fastRule.ruleName,
+          },
+          description:
+            'Enables frequent Transcribe concurrency reconciliation while a concurrency alarm is firing',
+        },
+      );
+
+      scheduleFunction.addToRolePolicy(
+        new iam.PolicyStatement({
+          actions: ['cloudwatch:DescribeAlarms'],
+          resources: ['*'],
+        }),
+      );
+
+      scheduleFunction.addToRolePolicy(
+        new iam.PolicyStatement({
+          actions: ['events:EnableRule', 'events:DisableRule'],
+          resources: [fastRule.ruleArn],
+        }),
+      );
+
+      const alarmStateRule = new events.Rule(this, 'AlarmStateChangeRule', {
+        eventPattern: {
+          source: ['aws.cloudwatch'],
+          detailType: ['CloudWatch Alarm State Change'],
+          resources: cadenceAlarms.map((a) => a.alarmArn),
+        },
+        description:
+          'Switches the reconciliation cadence when a concurrency alarm changes state',
+      });
+      alarmStateRule.addTarget(new targets.LambdaFunction(scheduleFunction));
+    }
+
     // Output the Lambda function ARN and CloudWatch Alarm ARN
     new cdk.CfnOutput(this, 'MonitoringFunctionArn', {
       value: monitoringFunction.functionArn,
@@ -88,9 +414,20 @@ export class TranscribeMonitorCdkStack extends cdk.Stack {
         'ARN of the Transcribe concurrency monitoring Lambda function',
     });
 
+    new cdk.CfnOutput(this, 'StateHandlerFunctionArn', {
+      value: stateHandlerFunction.functionArn,
+      description: 'ARN of the Transcribe job state handler Lambda function',
+    });
+
     new cdk.CfnOutput(this, 'ConcurrencyAlarmArn', {
       value: alarm.alarmArn,
       description: 'ARN of the CloudWatch Alarm for Transcribe concurrency',
     });
+
+    new cdk.CfnOutput(this, 'CallAnalyticsConcurrencyAlarmArn', {
+      value: callAnalyticsAlarm.alarmArn,
+      description:
+        'ARN of the CloudWatch Alarm for Transcribe Call Analytics concurrency',
+    });
   }
 }
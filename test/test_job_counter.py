@@ -0,0 +1,233 @@
+"""Tests for the active job counter helpers, run against stubbed DynamoDB
+
+Run with: python -m pytest test
+"""
+
+import os
+import sys
+
+import boto3
+import pytest
+from botocore.stub import ANY, Stubber
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambda"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import job_counter  # noqa: E402
+import transcribe_concurrency_monitor  # noqa: E402
+
+TABLE = "JobCounterTable"
+COUNTER = "ActiveCallAnalyticsJobs"
+JOB = "job-1"
+
+
+def make_client():
+    return boto3.client(
+        "dynamodb",
+        region_name="us-east-1",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    )
+
+
+@pytest.fixture
+def client():
+    return make_client()
+
+
+@pytest.fixture
+def stubber(client):
+    with Stubber(client) as client_stubber:
+        yield client_stubber
+        client_stubber.assert_no_pending_responses()
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(job_counter.time, "sleep", lambda seconds: None)
+
+
+def counter_update(delta):
+    return {
+        "Update": {
+            "TableName": TABLE,
+            "Key": {"Id": {"S": COUNTER}},
+            "UpdateExpression": "ADD JobCount :delta",
+            "ExpressionAttributeValues": {":delta": {"N": str(delta)}},
+        }
+    }
+
+
+def start_params(job_name=JOB):
+    return {
+        "TransactItems": [
+            {
+                "Put": {
+                    "TableName": TABLE,
+                    "Item": {
+                        "Id": {"S": f"{COUNTER}#{job_name}"},
+                        "JobName": {"S": job_name},
+                        "ActiveCounter": {"S": COUNTER},
+                        "RecordedAt": {"N": ANY},
+                    },
+                    "ConditionExpression": "attribute_not_exists(Id)",
+                }
+            },
+            counter_update(1),
+        ]
+    }
+
+
+def finish_params(job_name=JOB):
+    return {
+        "TransactItems": [
+            {
+                "Update": {
+                    "TableName": TABLE,
+                    "Key": {"Id": {"S": f"{COUNTER}#{job_name}"}},
+                    "UpdateExpression": "REMOVE ActiveCounter SET ExpiresAt = :expires",
+                    "ConditionExpression": "attribute_exists(ActiveCounter)",
+                    "ExpressionAttributeValues": {":expires": {"N": ANY}},
+                }
+            },
+            counter_update(-1),
+        ]
+    }
+
+
+def tombstone_params(job_name=JOB):
+    return {
+        "TableName": TABLE,
+        "Item": {
+            "Id": {"S": f"{COUNTER}#{job_name}"},
+            "JobName": {"S": job_name},
+            "ExpiresAt": {"N": ANY},
+        },
+        "ConditionExpression": "attribute_not_exists(Id)",
+    }
+
+
+def add_transaction(stubber, expected_params, reason=None):
+    """Queue a transaction that succeeds, or is cancelled on the job item"""
+    if reason is None:
+        stubber.add_response("transact_write_items", {}, expected_params)
+    else:
+        stubber.add_client_error(
+            "transact_write_items",
+            service_error_code="TransactionCanceledException",
+            expected_params=expected_params,
+            modeled_fields={
+                "CancellationReasons": [{"Code": reason}, {"Code": "None"}]
+            },
+        )
+
+
+def add_tombstone(stubber, exists):
+    if exists:
+        stubber.add_client_error(
+            "put_item",
+            service_error_code="ConditionalCheckFailedException",
+            expected_params=tombstone_params(),
+        )
+    else:
+        stubber.add_response("put_item", {}, tombstone_params())
+
+
+def test_duplicate_start_counted_once(client, stubber):
+    add_transaction(stubber, start_params())
+    add_transaction(stubber, start_params(), "ConditionalCheckFailed")
+
+    assert job_counter.record_job_started(client, TABLE, COUNTER, JOB)
+    assert not job_counter.record_job_started(client, TABLE, COUNTER, JOB)
+
+
+def test_finish_before_start_leaves_tombstone(client, stubber):
+    add_transaction(stubber, finish_params(), "ConditionalCheckFailed")
+    add_tombstone(stubber, exists=False)
+    # The late start then fails on the tombstone
+    add_transaction(stubber, start_params(), "ConditionalCheckFailed")
+
+    assert not job_counter.record_job_finished(client, TABLE, COUNTER, JOB)
+    assert not job_counter.record_job_started(client, TABLE, COUNTER, JOB)
+
+
+def test_repeated_finish_counted_once(client, stubber):
+    add_transaction(stubber, finish_params())
+    for _ in range(2):
+        add_transaction(stubber, finish_params(), "ConditionalCheckFailed")
+        add_tombstone(stubber, exists=True)
+
+    assert job_counter.record_job_finished(client, TABLE, COUNTER, JOB)
+    assert not job_counter.record_job_finished(client, TABLE, COUNTER, JOB)
+
+
+def test_finish_retried_when_start_recorded_before_tombstone(client, stubber):
+    add_transaction(stubber, finish_params(), "ConditionalCheckFailed")
+    add_tombstone(stubber, exists=True)
+    add_transaction(stubber, finish_params())
+
+    assert job_counter.record_job_finished(client, TABLE, COUNTER, JOB)
+
+
+def test_transaction_conflict_retried(client, stubber):
+    add_transaction(stubber, start_params(), "TransactionConflict")
+    add_transaction(stubber, start_params(), "TransactionConflict")
+    add_transaction(stubber, start_params())
+
+    assert job_counter.record_job_started(client, TABLE, COUNTER, JOB)
+
+
+def test_transaction_conflict_retries_bounded(client, stubber):
+    for _ in range(job_counter.TRANSACTION_CONFLICT_RETRIES + 1):
+        add_transaction(stubber, start_params(), "TransactionConflict")
+
+    with pytest.raises(client.exceptions.TransactionCanceledException):
+        job_counter.record_job_started(client, TABLE, COUNTER, JOB)
+
+
+def test_reconcile_only_finishes_jobs_recorded_before_scan(monkeypatch):
+    dynamodb_client = make_client()
+    monkeypatch.setattr(
+        transcribe_concurrency_monitor, "dynamodb_client", dynamodb_client
+    )
+
+    with Stubber(dynamodb_client) as stubber:
+        stubber.add_response(
+            "query",
+            {
+                "Items": [
+                    {"JobName": {"S": "listed"}, "RecordedAt": {"N": "100"}},
+                    {"JobName": {"S": "finished"}, "RecordedAt": {"N": "100"}},
+                    {"JobName": {"S": "late"}, "RecordedAt": {"N": "200"}},
+                ]
+            },
+            {
+                "TableName": TABLE,
+                "IndexName": "ActiveJobs",
+                "KeyConditionExpression": "ActiveCounter = :counter",
+                "ExpressionAttributeValues": {":counter": {"S": COUNTER}},
+            },
+        )
+        # Only the job recorded before the listing began and not listed
+        add_transaction(stubber, finish_params("finished"))
+
+        transcribe_concurrency_monitor.reconcile_counter(
+            TABLE, COUNTER, {"listed"}, scan_started=150
+        )
+        stubber.assert_no_pending_responses()
+
+
+def test_reconcile_starts_unrecorded_jobs(monkeypatch):
+    dynamodb_client = make_client()
+    monkeypatch.setattr(
+        transcribe_concurrency_monitor, "dynamodb_client", dynamodb_client
+    )
+
+    with Stubber(dynamodb_client) as stubber:
+        stubber.add_response("query", {"Items": []})
+        add_transaction(stubber, start_params("missed-start"))
+
+        transcribe_concurrency_monitor.reconcile_counter(
+            TABLE, COUNTER, {"missed-start"}, scan_started=150
+        )
+        stubber.assert_no_pending_responses()
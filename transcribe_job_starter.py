@@ -4,13 +4,19 @@
 """Generates load on the Transcribe service"""
 
 import argparse
+import concurrent.futures
+import functools
+import itertools
+import json
 import sys
+import threading
 import time
 import uuid
-import random
 import logging
 
 import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 
 
 # Configure logging
@@ -22,6 +28,41 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def create_client_config(max_retries, concurrency):
+    """
+    Create the botocore configuration for the AWS clients that submit jobs
+    (Transcribe, or SQS when queueing job requests)
+
+    Parameters:
+    - max_retries: Maximum number of retry attempts per API call
+    - concurrency: Number of threads sharing the client
+
+    Returns:
+    - botocore Config object
+    """
+    # Large connection pool with keepalive so bursts of parallel calls reuse
+    # TLS connections, with a connection for every submitting thread so none
+    # waits on the pool. Throttling and transient service errors are retried by
+    # botocore's adaptive mode, which also rate limits the client on throttling.
+    # Short timeouts stop stalled calls from holding sockets for the default
+    # 60 seconds under sustained load.
+    return Config(
+        max_pool_connections=max(64, concurrency),
+        tcp_keepalive=True,
+        connect_timeout=3,
+        read_timeout=10,
+        retries={"mode": "adaptive", "total_max_attempts": max_retries + 1},
+    )
+
+
+def positive_int(value):
+    """argparse type for integers of at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
 def parse_arguments():
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(
@@ -53,83 +94,195 @@ def parse_arguments():
         "--delay",
         type=float,
         default=0.1,
-        help="Delay between job starts in seconds (default: 0.1)",
+        help="Minimum interval between job starts in seconds (default: 0.1)",
     )
     parser.add_argument(
-        "--region", default="us-east-1", help="AWS region (default: us-east-1)"
+        "--concurrency",
+        type=positive_int,
+        default=16,
+        help="Number of jobs submitted in parallel (default: 16)",
     )
     parser.add_argument(
-        "--max-retries",
-        type=int,
-        default=5,
-        help="Maximum number of retry attempts (default: 5)",
+        "--queue-url",
+        help="SQS queue URL of the deployed job submitter. When set, job "
+        "requests are queued in batches instead of started directly",
     )
     parser.add_argument(
-        "--base-delay",
-        type=float,
-        default=1.0,
-        help="Base delay for exponential backoff in seconds (default: 1.0)",
+        "--region", default="us-east-1", help="AWS region (default: us-east-1)"
     )
     parser.add_argument(
-        "--max-delay",
-        type=float,
-        default=60.0,
-        help="Maximum delay for exponential backoff in seconds (default: 60.0)",
+        "--max-retries",
+        type=int,
+        default=5,
+        help="Maximum number of SDK retry attempts per API call (default: 5)",
     )
+    # Deprecated: retries are now made by the SDK, which applies its own
+    # backoff. Still accepted so existing invocations keep working.
+    parser.add_argument("--base-delay", type=float, help=argparse.SUPPRESS)
+    parser.add_argument("--max-delay", type=float, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    if args.base_delay is not None or args.max_delay is not None:
+        logger.warning(
+            "--base-delay and --max-delay are deprecated and ignored; the AWS "
+            "SDK applies its own backoff between retries"
+        )
+
+    return args
+
+
+class RateLimiter:
+    """Thread-safe token bucket that spaces calls evenly at a fixed rate"""
 
-    return parser.parse_args()
+    def __init__(self, rate_per_sec):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec > 0 else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
 
+    def acquire(self):
+        """Block until the caller may make its next call"""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            # Reserve the next slot; idle time does not build up a burst
+            self._next_slot = max(self._next_slot, now) + self.interval
 
-def calculate_backoff_with_jitter(attempt, base_delay=1, max_delay=60):
+        if wait > 0:
+            time.sleep(wait)
+
+
+def validate_inputs(config):
     """
-    Calculate exponential backoff with jitter
+    Check credentials and the S3 input file before any jobs are started,
+    since every job shares them. The output bucket is only checked as a
+    warning: Transcribe writes to it with the data access role, which may
+    have access the caller lacks.
 
     Parameters:
-    - attempt: The current retry attempt (0-based)
-    - base_delay: The base delay in seconds
-    - max_delay: The maximum delay in seconds
+    - config: Configuration object
 
     Returns:
-    - Backoff time with jitter in seconds
+    - Boolean indicating whether the inputs are valid
     """
-    # Calculate exponential backoff: base_delay * 2^attempt
-    backoff = base_delay * (2**attempt)
+    try:
+        boto3.client("sts", region_name=config.region).get_caller_identity()
+    except (BotoCoreError, ClientError) as e:
+        logger.error("Unable to verify AWS credentials: %s", str(e))
+        return False
+
+    s3_client = boto3.client("s3", region_name=config.region)
+
+    try:
+        s3_client.head_object(Bucket=config.input_bucket, Key=config.input_file)
+    except (BotoCoreError, ClientError) as e:
+        logger.error(
+            "Input file s3://%s/%s is not accessible: %s",
+            config.input_bucket,
+            config.input_file,
+            str(e),
+        )
+        return False
+
+    try:
+        s3_client.head_bucket(Bucket=config.output_bucket)
+    except (BotoCoreError, ClientError) as e:
+        logger.warning(
+            "Output bucket %s is not accessible with your credentials: %s. "
+            "Jobs will fail unless the data access role can write to it",
+            config.output_bucket,
+            str(e),
+        )
+
+    return True
 
-    # Apply a cap to the backoff
-    backoff = min(backoff, max_delay)
 
-    # Add jitter: random value between 0 and backoff
-    jitter = random.uniform(0, backoff * 0.25)
+def build_job_kwargs(config):
+    """
+    Build the StartCallAnalyticsJob arguments shared by every job
 
-    # Return backoff with jitter
-    return backoff + jitter
+    Parameters:
+    - config: Configuration object
+
+    Returns:
+    - Dictionary of keyword arguments, excluding the job name
+    """
+    return {
+        "Media": {"MediaFileUri": f"s3://{config.input_bucket}/{config.input_file}"},
+        "DataAccessRoleArn": config.role_arn,
+        "OutputLocation": f"s3://{config.output_bucket}/transcribe-results/",
+        "ChannelDefinitions": [
+            {"ChannelId": 0, "ParticipantRole": "AGENT"},
+            {"ChannelId": 1, "ParticipantRole": "CUSTOMER"},
+        ],
+    }
 
 
 def start_jobs(config):
     """Start multiple Transcribe jobs"""
     logger.info("Starting %d Transcribe Call Analytics jobs...", config.count)
 
-    successful_jobs = 0
-    failed_jobs = 0
+    # Create the client once and share it across all jobs
+    transcribe_client = boto3.client(
+        "transcribe",
+        region_name=config.region,
+        config=create_client_config(config.max_retries, config.concurrency),
+    )
 
-    for i in range(config.count):
-        success = start_job_with_retry(config)
-        if success:
-            successful_jobs += 1
-        else:
-            failed_jobs += 1
+    # Submission rate is independent of per-call latency and worker count
+    rate_limiter = RateLimiter(1.0 / config.delay if config.delay > 0 else 0)
+
+    # Bind everything shared by the jobs once; only the job name differs.
+    # The modeled exception classes are resolved here rather than on every
+    # catch.
+    submit_job = functools.partial(
+        start_job,
+        transcribe_client=transcribe_client,
+        rate_limiter=rate_limiter,
+        job_kwargs=build_job_kwargs(config),
+        bad_request_error=transcribe_client.exceptions.BadRequestException,
+        conflict_error=transcribe_client.exceptions.ConflictException,
+    )
 
-        # Log progress every 10 jobs or at the end
-        if (i + 1) % 10 == 0 or i == config.count - 1:
-            logger.info(
-                "Progress: %d/%d jobs started (Success: %d, Failed: %d)",
-                i + 1,
-                config.count,
-                successful_jobs,
-                failed_jobs,
-            )
+    # Job names only need to be unique within this run, so a single random
+    # run id plus a counter avoids generating a uuid for every job
+    run_id = uuid.uuid4().hex
+    job_numbers = itertools.count()
 
-        time.sleep(config.delay)
+    successful_jobs = 0
+    failed_jobs = 0
+
+    # The low-level client is thread-safe, so all workers share it
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=config.concurrency
+    ) as executor:
+        try:
+            futures = [
+                executor.submit(
+                    submit_job, f"CallAnalyticsJob-{run_id}-{next(job_numbers)}"
+                )
+                for _ in range(config.count)
+            ]
+
+            for i, future in enumerate(concurrent.futures.as_completed(futures)):
+                if future.result():
+                    successful_jobs += 1
+                else:
+                    failed_jobs += 1
+
+                # Log progress every 10 jobs or at the end
+                if (i + 1) % 10 == 0 or i == config.count - 1:
+                    logger.info(
+                        "Progress: %d/%d jobs started (Success: %d, Failed: %d)",
+                        i + 1,
+                        config.count,
+                        successful_jobs,
+                        failed_jobs,
+                    )
+        except KeyboardInterrupt:
+            # Don't start the queued jobs; only calls already in flight finish
+            logger.info("Cancelling jobs that have not been started yet...")
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
 
     logger.info(
         "Completed job submission. Successful: %d, Failed: %d",
@@ -138,128 +291,158 @@ def start_jobs(config):
     )
 
 
-def start_job_with_retry(config, job_name=None):
+def start_job(
+    job_name,
+    *,
+    transcribe_client,
+    rate_limiter,
+    job_kwargs,
+    bad_request_error,
+    conflict_error,
+):
     """
-    Start a Transcribe job with retry logic
+    Start a Transcribe job. Throttling, service and connection errors are
+    retried by botocore according to --max-retries.
 
     Parameters:
-    - config: Configuration object
-    - job_name: Optional job name to use (for retries)
+    - job_name: Name of the job, unique within this run
+    - transcribe_client: Shared boto3 Transcribe client
+    - rate_limiter: RateLimiter pacing calls to the Transcribe API
+    - job_kwargs: StartCallAnalyticsJob arguments shared by every job
+    - bad_request_error: The client's BadRequestException class
+    - conflict_error: The client's ConflictException class
 
     Returns:
     - Boolean indicating success or failure
     """
-    if not job_name:
-        job_name = f"CallAnalyticsJob-{uuid.uuid4()}"
+    try:
+        rate_limiter.acquire()
+        response = transcribe_client.start_call_analytics_job(
+            CallAnalyticsJobName=job_name, **job_kwargs
+        )
+
+        status = response["CallAnalyticsJob"]["CallAnalyticsJobStatus"]
+        logger.info("Call Analytics Job started: %s -- Status: %s", job_name, status)
+        return True
+
+    except bad_request_error as e:
+        logger.error("Bad request error: %s. Check your input parameters.", str(e))
+        return False
+
+    except conflict_error:
+        # Job names are unique to this run, so the job was started by an
+        # earlier attempt whose response was lost (e.g. a read timeout)
+        logger.info("Call Analytics Job already started: %s", job_name)
+        return True
+
+    except (BotoCoreError, ClientError) as e:
+        # Retryable errors have already been retried by botocore
+        logger.error("Error starting Call Analytics Job %s: %s", job_name, str(e))
+        return False
+
+    except Exception as e:
+        logger.error("Unexpected error starting Call Analytics Job: %s", str(e))
+        return False
+
+
+def enqueue_jobs(config):
+    """Queue job requests for the job submitter Lambda function"""
+    logger.info("Queueing %d Transcribe Call Analytics job requests...", config.count)
+
+    sqs_client = boto3.client(
+        "sqs",
+        region_name=config.region,
+        config=create_client_config(config.max_retries, config.concurrency),
+    )
+
+    # Job names are fixed when queued so a redelivered message cannot start
+    # a second job
+    run_id = uuid.uuid4().hex
+    messages = [
+        json.dumps(
+            {
+                "job_name": f"CallAnalyticsJob-{run_id}-{i}",
+                "input_bucket": config.input_bucket,
+                "input_file": config.input_file,
+                "output_bucket": config.output_bucket,
+                "role_arn": config.role_arn,
+            }
+        )
+        for i in range(config.count)
+    ]
 
-    transcribe_client = boto3.client("transcribe", region_name=config.region)
+    successful_jobs = 0
 
-    for attempt in range(config.max_retries + 1):
+    # SendMessageBatch accepts at most 10 messages per call
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=config.concurrency
+    ) as executor:
         try:
-            if attempt > 0:
-                logger.info(
-                    "Retry attempt %d/%d for job %s",
-                    attempt,
-                    config.max_retries,
-                    job_name,
+            futures = [
+                executor.submit(
+                    send_message_batch,
+                    sqs_client,
+                    config.queue_url,
+                    messages[i : i + 10],
                 )
+                for i in range(0, len(messages), 10)
+            ]
 
-            response = transcribe_client.start_call_analytics_job(
-                CallAnalyticsJobName=job_name,
-                Media={
-                    "MediaFileUri": f"s3://{config.input_bucket}/{config.input_file}"
-                },
-                DataAccessRoleArn=config.role_arn,
-                OutputLocation=f"s3://{config.output_bucket}/transcribe-results/",
-                ChannelDefinitions=[
-                    {"ChannelId": 0, "ParticipantRole": "AGENT"},
-                    {"ChannelId": 1, "ParticipantRole": "CUSTOMER"},
-                ],
-            )
-
-            status = response["CallAnalyticsJob"]["CallAnalyticsJobStatus"]
-            logger.info(
-                "Call Analytics Job started: %s -- Status: %s", job_name, status
-            )
-            return True
-
-        except transcribe_client.exceptions.BadRequestException as e:
-            logger.error("Bad request error: %s. Check your input parameters.", str(e))
-            # Don't retry bad requests as they're unlikely to succeed
-            return False
-
-        except transcribe_client.exceptions.LimitExceededException as e:
-            logger.warning("Service limit exceeded: %s", str(e))
-
-            if attempt < config.max_retries:
-                backoff = calculate_backoff_with_jitter(
-                    attempt, config.base_delay, config.max_delay
-                )
-                logger.info("Backing off for %.2f seconds before retry", backoff)
-                time.sleep(backoff)
-            else:
-                logger.error("Max retries reached for limit exceeded error")
-                return False
-
-        except transcribe_client.exceptions.ConflictException as e:
-            logger.warning(
-                "Conflict error: %s. A job with name %s may already exist.",
-                str(e),
-                job_name,
-            )
-
-            # Generate a new job name and try again immediately
-            new_job_name = f"CallAnalyticsJob-{uuid.uuid4()}"
-            logger.info("Retrying with new job name: %s", new_job_name)
-
-            # Instead of recursion, we'll use the new job name in the next iteration
-            job_name = new_job_name
-            # Don't count this as a retry attempt since it's a name conflict
-            continue
-
-        except (
-            transcribe_client.exceptions.InternalFailureException,
-            transcribe_client.exceptions.ServiceUnavailableException,
-        ) as e:
-            error_type = (
-                "Internal AWS service error"
-                if isinstance(e, transcribe_client.exceptions.InternalFailureException)
-                else "Service unavailable"
-            )
-
-            logger.warning("%s: %s", error_type, str(e))
-
-            if attempt < config.max_retries:
-                backoff = calculate_backoff_with_jitter(
-                    attempt, config.base_delay, config.max_delay
-                )
-                logger.info("Backing off for %.2f seconds before retry", backoff)
-                time.sleep(backoff)
-            else:
-                logger.error("Max retries reached for %s", error_type.lower())
-                return False
-
-        except Exception as e:
-            logger.error("Unexpected error starting Call Analytics Job: %s", str(e))
-
-            if attempt < config.max_retries:
-                backoff = calculate_backoff_with_jitter(
-                    attempt, config.base_delay, config.max_delay
-                )
-                logger.info("Backing off for %.2f seconds before retry", backoff)
-                time.sleep(backoff)
-            else:
-                logger.error("Max retries reached for unexpected error")
-                return False
+            for future in concurrent.futures.as_completed(futures):
+                successful_jobs += future.result()
+        except KeyboardInterrupt:
+            # Don't queue the remaining batches; only calls in flight finish
+            logger.info("Cancelling job requests that have not been queued yet...")
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    logger.info(
+        "Completed queueing job requests. Successful: %d, Failed: %d",
+        successful_jobs,
+        config.count - successful_jobs,
+    )
+
+
+def send_message_batch(sqs_client, queue_url, messages):
+    """
+    Send up to 10 job request messages to SQS in a single call
+
+    Parameters:
+    - sqs_client: Shared boto3 SQS client
+    - queue_url: URL of the job request queue
+    - messages: List of message bodies
+
+    Returns:
+    - Number of messages successfully queued
+    """
+    try:
+        response = sqs_client.send_message_batch(
+            QueueUrl=queue_url,
+            Entries=[
+                {"Id": str(i), "MessageBody": body} for i, body in enumerate(messages)
+            ],
+        )
+    except Exception as e:
+        logger.error("Error queueing job requests: %s", str(e))
+        return 0
 
-    # If we get here, all retries failed
-    return False
+    for failure in response.get("Failed", ()):
+        logger.error(
+            "Error queueing job request: %s", failure.get("Message", failure["Code"])
+        )
+
+    return len(response.get("Successful", ()))
 
 
 if __name__ == "__main__":
     try:
         args = parse_arguments()
-        start_jobs(args)
+        if not validate_inputs(args):
+            sys.exit(1)
+        if args.queue_url:
+            enqueue_jobs(args)
+        else:
+            start_jobs(args)
     except KeyboardInterrupt:
         logger.info("Process interrupted by user. Exiting gracefully.")
         sys.exit(0)